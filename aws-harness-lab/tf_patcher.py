@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Shared engine for the Terraform patch scripts in this directory.
+
+A Rule describes one kind of patch: which resource blocks to look in
+(resource type, optionally a specific resource name) and which attribute
+lines must exist there, uncommented, with the desired values. Pairs listed
+in `groups` are kept adjacent with no blank line between them.
+
+Per resource block:
+  1) If an uncommented line with the desired value exists -> no action.
+  2) If present but commented (# or //) -> uncomment and normalize to desired value.
+  3) If missing -> add before the closing '}' of the block.
+  4) Keep each `groups` pair adjacent (no blank between).
+  5) If the attribute exists with a different value, leave as-is unless
+     enforce=True.
+
+The concrete rules live in RULES; the patch_tf*.py scripts are thin CLI
+wrappers that pick a rule and call apply_rules().
+"""
+
+import mmap
+import os
+import re
+import sys
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+# google-re2 compiles to a linear-time DFA, which pays off when the hot
+# patterns below run over every line of a large repo sweep. Optional: the
+# stdlib engine is used when it isn't installed.
+try:
+    import re2 as _re2
+except ImportError:
+    _re2 = None
+
+def _compile_hot(pattern: str, flags: int = 0):
+    """Compile a hot-loop pattern with re2 when available, else stdlib re."""
+    # The google-re2 binding takes an re2.Options object, not stdlib flag
+    # ints; only attempt it for flags we can translate faithfully.
+    if _re2 is not None and not (flags & ~re.IGNORECASE):
+        opts = _re2.Options()
+        opts.case_sensitive = not (flags & re.IGNORECASE)
+        try:
+            return _re2.compile(pattern, opts)
+        except _re2.error:
+            pass  # pattern uses a feature RE2 doesn't support
+    return re.compile(pattern, flags)
+
+@lru_cache(maxsize=None)
+def build_any_value_uncommented_re(attr: str) -> re.Pattern:
+    # Cached permanently: unlike re's 512-entry module cache, this can't be
+    # flushed by whatever other regexes a host CI harness compiles.
+    return re.compile(rf'^\s*{re.escape(attr)}\s*=\s*.+$', re.IGNORECASE)
+
+_NEWLINE_RE = re.compile(r'\r\n|\r|\n')
+
+def _leading_ws(s: str) -> str:
+    """Leading spaces/tabs of a line; cheaper than re.match(r'^(\\s*)', s)."""
+    i = 0
+    n = len(s)
+    while i < n and (s[i] == ' ' or s[i] == '\t'):
+        i += 1
+    return s[:i]
+
+@dataclass(frozen=True)
+class Rule:
+    """One patch rule; all regexes are compiled once at construction."""
+    resource_type: str
+    target_attrs: Tuple[Tuple[str, str], ...]
+    groups: Tuple[Tuple[str, str], ...] = ()
+    resource_name: Optional[str] = None  # None = any resource name
+
+    # Derived, built in __post_init__
+    needle: str = field(init=False, repr=False)
+    header_re: re.Pattern = field(init=False, repr=False)
+    token_re: re.Pattern = field(init=False, repr=False)
+    combined_re: re.Pattern = field(init=False, repr=False)
+    expected_lc: Tuple[str, ...] = field(init=False, repr=False)
+    any_value_res: Dict[str, re.Pattern] = field(init=False, repr=False)
+    first_chars: frozenset = field(init=False, repr=False)
+    attr_pos: Dict[str, int] = field(init=False, repr=False)
+    classify_line: Callable[[str], Optional[Tuple[int, Optional[str], str]]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        name_pat = re.escape(self.resource_name) if self.resource_name else '[^"]+'
+        head = rf'resource\s+"{re.escape(self.resource_type)}"\s+"{name_pat}"\s*\{{'
+        combined = (
+            r'^\s*(?:(?P<cmt>#|//)\s*)?(?P<attr>'
+            + '|'.join(re.escape(attr) for attr, _ in self.target_attrs)
+            + r')\s*=\s*(?P<val>.*?)\s*$'
+        )
+        object.__setattr__(self, "needle", f'"{self.resource_type}"')
+        object.__setattr__(self, "header_re", re.compile(rf'^\s*{head}\s*$', re.IGNORECASE))
+        object.__setattr__(self, "token_re", _compile_hot(rf'({head})|([{{}}])', re.IGNORECASE))
+        object.__setattr__(self, "combined_re", _compile_hot(combined, re.IGNORECASE))
+        object.__setattr__(self, "expected_lc", tuple(value.lower() for _, value in self.target_attrs))
+        object.__setattr__(self, "attr_pos", {attr: k for k, (attr, _) in enumerate(self.target_attrs)})
+        object.__setattr__(
+            self,
+            "any_value_res",
+            {attr: build_any_value_uncommented_re(attr) for attr, _ in self.target_attrs},
+        )
+        # Any line combined_re can match starts (after indentation) with a
+        # comment marker or a target attribute name; everything else can be
+        # rejected with a single character test instead of a regex call.
+        object.__setattr__(
+            self,
+            "first_chars",
+            frozenset({'#', '/'}
+                      | {attr[0].lower() for attr, _ in self.target_attrs}
+                      | {attr[0].upper() for attr, _ in self.target_attrs}),
+        )
+        # Specialized classifier generated once per rule: the fixed attribute
+        # set is unrolled into straight string comparisons, so a matched line
+        # resolves to its attribute slot without a dict lookup or loop.
+        # Returns (attr_index, cmt_group, val_group) or None.
+        src = [
+            "def _classify(raw):",
+            "    m = _match(raw)",
+            "    if m is None:",
+            "        return None",
+            "    a = m.group('attr')",
+        ]
+        for k, (attr, _) in enumerate(self.target_attrs):
+            src.append(f"    if a == {attr!r}:")
+            src.append(f"        return ({k}, m.group('cmt'), m.group('val'))")
+        src.append("    a = a.lower()")  # the match is IGNORECASE
+        for k, (attr, _) in enumerate(self.target_attrs):
+            src.append(f"    if a == {attr.lower()!r}:")
+            src.append(f"        return ({k}, m.group('cmt'), m.group('val'))")
+        src.append("    return None")
+        ns = {"_match": self.combined_re.match}
+        exec("\n".join(src), ns)
+        object.__setattr__(self, "classify_line", ns["_classify"])
+
+    def __reduce__(self):
+        # Rebuild derived state (including the generated classifier, which
+        # cannot be pickled) when a Rule travels to ProcessPoolExecutor
+        # workers.
+        return (self.__class__,
+                (self.resource_type, self.target_attrs, self.groups, self.resource_name))
+
+# The rules the wrapper scripts ship today
+RULES: Dict[str, Rule] = {
+    "vpn_tunnels": Rule(
+        resource_type="aws_vpn_connection",
+        target_attrs=(
+            ("tunnel1_startup_action", '"start"'),
+            ("tunnel2_startup_action", '"start"'),
+            ("tunnel1_enable_tunnel_lifecycle_control", 'true'),
+            ("tunnel2_enable_tunnel_lifecycle_control", 'true'),
+        ),
+        groups=(
+            ("tunnel1_startup_action", "tunnel2_startup_action"),
+            ("tunnel1_enable_tunnel_lifecycle_control", "tunnel2_enable_tunnel_lifecycle_control"),
+        ),
+    ),
+    "vpc_tenancy": Rule(
+        resource_type="aws_vpc",
+        resource_name="main",
+        target_attrs=(("instance_tenancy", '"default"'),),
+    ),
+}
+
+def find_resource_blocks(rule: Rule, text: str, lines: List[str]) -> List[Tuple[int, int]]:
+    """
+    Return list of (start_idx, end_idx_inclusive) for each block of the
+    rule's resource type. Single tokenizer pass over `text`: headers and
+    braces are streamed in order and byte offsets map back to line indices
+    via bisect.
+    """
+    blocks: List[Tuple[int, int]] = []
+    # Cheap substring pre-filter: files without the resource type (the
+    # common case in a repo-wide sweep) skip the tokenizer pass entirely.
+    if rule.needle not in text:
+        return blocks
+
+    line_starts = [0]
+    for nl in _NEWLINE_RE.finditer(text):
+        line_starts.append(nl.end())
+
+    depth = 0
+    start = -1  # header line of the block currently open, or -1
+    for m in rule.token_re.finditer(text):
+        line_idx = bisect_right(line_starts, m.start()) - 1
+        if start < 0:
+            # Only a full-line resource header opens a block; stray braces
+            # outside matching blocks are ignored.
+            if m.group(1) and rule.header_re.match(lines[line_idx]):
+                start = line_idx
+                depth = 1
+        else:
+            if m.group(2) == "}":
+                depth -= 1
+                if depth == 0:
+                    blocks.append((start, line_idx))
+                    start = -1
+            else:  # '{' or a nested header token, either way one open brace
+                depth += 1
+    return blocks
+
+def ensure_attributes_in_block(
+    rule: Rule, lines: List[str], start: int, end: int, enforce: bool
+) -> Tuple[bool, List[str], Optional[List[str]]]:
+    """
+    Ensure rule.target_attrs exist in lines[start:end+1].
+    Does not mutate `lines`; returns (modified?, messages, new_body) where
+    new_body replaces lines[start+1:end] (None when the block is unchanged)
+    so the caller can rebuild the whole file in a single pass instead of
+    paying an O(file) tail shift for every inserted line.
+    """
+    modified = False
+    msgs: List[str] = []
+
+    # Indentation: pick it from first non-empty inner line else default "  "
+    inner_indent = "  "
+    for k in range(start + 1, end + 1):
+        if lines[k].strip():
+            inner_indent = _leading_ws(lines[k]) or "  "
+            break
+
+    # Per-block match state, indexed by attribute position in target_attrs;
+    # tiny fixed-size lists beat attr-keyed dicts here.
+    n_attrs = len(rule.target_attrs)
+    exists_exact = [False] * n_attrs
+    commented_idx: List[Optional[int]] = [None] * n_attrs
+    other_value_idx: List[Optional[int]] = [None] * n_attrs
+
+    # Scan current block: one combined match per line, classify on groups.
+    # A cheap startswith-style character test filters out the lines that
+    # cannot possibly match before any regex machinery runs.
+    for idx in range(start + 1, end):
+        raw = lines[idx]
+        stripped = raw.lstrip()
+        if not stripped or stripped[0] not in rule.first_chars:
+            continue
+        res = rule.classify_line(raw)
+        if res is None:
+            continue
+        k, cmt, val = res
+        if cmt:
+            if commented_idx[k] is None:
+                commented_idx[k] = idx
+        elif not val:
+            continue  # bare "attr =" with no value; not a usable match
+        elif val.lower() == rule.expected_lc[k]:
+            exists_exact[k] = True
+        elif other_value_idx[k] is None:
+            other_value_idx[k] = idx
+
+    # 1/2/3: uncomment, enforce, or add (recorded as pending edits, applied below)
+    replacements = {}  # absolute line index -> new text
+    appended: List[str] = []  # new lines to add just before the closing brace
+    for k, (attr, value) in enumerate(rule.target_attrs):
+        target_line = f"{attr} = {value}"
+
+        if exists_exact[k]:
+            msgs.append(f"No change: '{target_line}' already present (uncommented).")
+            continue
+
+        if other_value_idx[k] is not None and not enforce:
+            msgs.append(
+                f"Skipped: '{attr}' present with a different value at line {other_value_idx[k]+1} "
+                f"(use --enforce to normalize to {value})."
+            )
+            continue
+
+        if other_value_idx[k] is not None and enforce:
+            i = other_value_idx[k]  # type: ignore[index]
+            indent = _leading_ws(lines[i]) or inner_indent
+            new_line = f"{indent}{target_line}"
+            if lines[i] != new_line:
+                replacements[i] = new_line
+                modified = True
+                msgs.append(f"Updated '{attr}' at line {i+1} to {value}.")
+            exists_exact[k] = True
+            continue
+
+        if commented_idx[k] is not None:
+            i = commented_idx[k]  # type: ignore[index]
+            indent = _leading_ws(lines[i]) or inner_indent
+            new_line = f"{indent}{target_line}"
+            if lines[i] != new_line:
+                replacements[i] = new_line
+                modified = True
+                msgs.append(f"Uncommented & normalized '{attr}' at line {i+1}.")
+            exists_exact[k] = True
+            continue
+
+        appended.append(f"{inner_indent}{target_line}")
+        modified = True
+        exists_exact[k] = True
+        msgs.append(f"Appended '{attr}' in resource block (before line {end+1}).")
+
+    # Effective block body after the pending edits; all further work is local
+    body = [replacements.get(i, lines[i]) for i in range(start + 1, end)] + appended
+
+    # Final pass: keep each pair adjacent (remove blanks between them; do NOT cross non-comment content)
+    if rule.groups:
+        # One walk of the body records the first uncommented line of every
+        # attribute, instead of a fresh scan per group member; positions are
+        # then kept in sync as lines are deleted or moved.
+        any_res = [rule.any_value_res[attr] for attr, _ in rule.target_attrs]
+        pos: List[Optional[int]] = [None] * n_attrs
+        remaining = n_attrs
+        for i, text_line in enumerate(body):
+            for k in range(n_attrs):
+                if pos[k] is None and any_res[k].match(text_line):
+                    pos[k] = i
+                    remaining -= 1
+            if not remaining:
+                break
+
+        for a1, a2 in rule.groups:
+            i1 = pos[rule.attr_pos[a1]]
+            i2 = pos[rule.attr_pos[a2]]
+            if i1 is None or i2 is None or i2 <= i1:
+                continue
+
+            # Remove blank-only lines between the two
+            j = i1 + 1
+            while j < i2:
+                if body[j].strip() == "":
+                    del body[j]
+                    modified = True
+                    i2 -= 1
+                    for k in range(n_attrs):
+                        if pos[k] is not None and pos[k] > j:
+                            pos[k] -= 1
+                else:
+                    j += 1
+
+            # If still not adjacent and only comments in between, move the second just after the first
+            if i2 != i1 + 1 and all(
+                body[k].strip() == "" or body[k].lstrip().startswith(("#", "//"))
+                for k in range(i1 + 1, i2)
+            ):
+                body.insert(i1 + 1, body.pop(i2))
+                modified = True
+                for k in range(n_attrs):
+                    if pos[k] is not None and i1 < pos[k] < i2:
+                        pos[k] += 1
+                i2 = i1 + 1
+            pos[rule.attr_pos[a2]] = i2
+
+    return modified, msgs, (body if modified else None)
+
+def _encoded_lines(lines: List[str], sep: bytes, keep_terminal_newline: bool):
+    """Yield encoded lines with separators for a streaming writelines()."""
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        if i < last:
+            yield line.encode("utf-8") + sep
+        else:
+            yield line.encode("utf-8")
+            if keep_terminal_newline:
+                yield sep
+
+def apply_rules(path: str, rules: List[Rule], dry_run: bool = False,
+                backup: bool = False, enforce: bool = False) -> int:
+    """Apply each rule to the file; returns a process exit code."""
+    if not os.path.isfile(path):
+        print(f"ERROR: file not found: {path}", file=sys.stderr)
+        return 1
+
+    # mmap the file where possible so the CRLF check and the resource-type
+    # needle scan run over the kernel's page cache with no bytes copy; files
+    # with nothing to patch (most of a repo sweep) are never decoded at all.
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mm = None  # zero-length file, or mapping unsupported
+        try:
+            buf = mm if mm is not None else f.read()
+            if all(buf.find(rule.needle.encode("utf-8")) < 0 for rule in rules):
+                wanted = " or ".join(f"'{rule.resource_type}'" for rule in rules)
+                print(f"NOTE: No {wanted} resource blocks found. No changes made.")
+                return 0
+            had_crlf = buf.find(b"\r\n") >= 0
+            # Only files that may actually contain blocks get materialized
+            raw = bytes(buf) if mm is not None else buf
+        finally:
+            if mm is not None:
+                mm.close()
+    text = raw.decode("utf-8", errors="replace")
+    # Maintain lines WITHOUT trailing '\n' in the list. Split on the same
+    # newline definition the tokenizer's offset table uses (\r\n, \r, \n) —
+    # splitlines() also breaks on \f, \x85, \u2028 etc., which would desync
+    # the byte-offset->line mapping and mangle those characters on rewrite.
+    lines = _NEWLINE_RE.split(text)
+    keep_terminal_newline = text.endswith(("\n", "\r"))
+    if keep_terminal_newline:
+        lines.pop()  # drop the empty element after the final newline
+
+    # Blocks for every rule, in file order; resource types are distinct so
+    # blocks from different rules never overlap.
+    tagged: List[Tuple[int, int, Rule]] = []
+    for rule in rules:
+        for (start, end) in find_resource_blocks(rule, text, lines):
+            tagged.append((start, end, rule))
+    tagged.sort(key=lambda t: t[0])
+    if not tagged:
+        wanted = " or ".join(f"'{rule.resource_type}'" for rule in rules)
+        print(f"NOTE: No {wanted} resource blocks found. No changes made.")
+        return 0
+
+    # Collect per-block rewrites, then rebuild the line list in one pass.
+    # Block offsets all refer to the original list, so earlier blocks growing
+    # or shrinking can no longer skew the scan window of later ones.
+    overall_modified = False
+    all_msgs: List[str] = []
+    out: List[str] = []
+    cursor = 0
+    for (start, end, rule) in tagged:
+        changed, msgs, new_body = ensure_attributes_in_block(rule, lines, start, end, enforce)
+        overall_modified |= changed
+        all_msgs.extend([f"[{start+1}-{end+1}] {m}" for m in msgs])
+        if new_body is not None:
+            out.extend(lines[cursor:start + 1])  # up to and including the header
+            out.extend(new_body)
+            cursor = end  # closing brace and the rest copied as-is
+    out.extend(lines[cursor:])
+    lines = out
+
+    print("Summary:")
+    for m in all_msgs:
+        print(" - " + m)
+
+    if not overall_modified:
+        # No-op invocations (the common case in CI) skip the full-file
+        # reassembly entirely.
+        print("No modifications were necessary.")
+        return 0
+
+    if dry_run:
+        print("\nDRY-RUN: Showing preview only; file not written.")
+    else:
+        if backup:
+            ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+            bak = f"{path}.{ts}.bak"
+            with open(bak, "wb") as b:
+                b.write(raw)
+            print(f"Backup created: {bak}")
+        # Stream lines out with the original separator instead of building
+        # a joined full-file string (plus a CRLF re-substituted copy) first.
+        sep = b"\r\n" if had_crlf else b"\n"
+        with open(path, "wb") as out_f:
+            out_f.writelines(_encoded_lines(lines, sep, keep_terminal_newline))
+        print("File updated.")
+
+    return 0